@@ -0,0 +1,153 @@
+import asyncio
+import math
+import threading
+from collections import OrderedDict, deque
+
+DEFAULT_MAX_STREAMS = 4
+
+
+class _Waiter:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+    def grant(self):
+        # Sessions run in their own threads and event loops, so wake the waiter
+        # on its own loop. A closed loop means the session is gone.
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False
+        self.granted = True
+        return True
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class _HostQueue:
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        # session_id -> deque of waiters, in round-robin order
+        self.sessions: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self.avg_duration = None
+
+
+class AdmissionController:
+    """Process-wide cap on in-flight streams per host with a per-session fair queue."""
+
+    def __init__(self, default_limit=DEFAULT_MAX_STREAMS):
+        self.default_limit = default_limit
+        self._lock = threading.Lock()
+        self._hosts: dict[str, _HostQueue] = {}
+
+    def set_limit(self, host, limit):
+        with self._lock:
+            queue = self._queue(host)
+            queue.limit = max(1, int(limit))
+            self._dispatch(queue)
+
+    def stats(self, host):
+        with self._lock:
+            queue = self._queue(host)
+            waiting = sum(len(w) for w in queue.sessions.values())
+            return {"limit": queue.limit, "active": queue.active, "waiting": waiting}
+
+    async def acquire(self, host, session_id, on_wait=None, poll_interval=1.0):
+        with self._lock:
+            queue = self._queue(host)
+            if queue.active < queue.limit and not queue.sessions:
+                queue.active += 1
+                return
+            waiter = _Waiter(session_id)
+            queue.sessions.setdefault(session_id, deque()).append(waiter)
+
+        try:
+            while True:
+                if on_wait is not None:
+                    with self._lock:
+                        position = self._position(queue, waiter)
+                        eta = self._estimate_wait(queue, position)
+                    if position is not None:
+                        on_wait(position, eta)
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), poll_interval)
+                    return
+                except asyncio.TimeoutError:
+                    continue
+        except BaseException:
+            with self._lock:
+                if waiter.granted:
+                    self._release(queue, None)
+                else:
+                    self._remove(queue, waiter)
+            raise
+
+    def release(self, host, duration=None):
+        with self._lock:
+            self._release(self._queue(host), duration)
+
+    def _queue(self, host):
+        queue = self._hosts.get(host)
+        if queue is None:
+            queue = self._hosts[host] = _HostQueue(self.default_limit)
+        return queue
+
+    def _release(self, queue, duration):
+        queue.active = max(0, queue.active - 1)
+        if duration is not None:
+            if queue.avg_duration is None:
+                queue.avg_duration = duration
+            else:
+                queue.avg_duration = 0.8 * queue.avg_duration + 0.2 * duration
+        self._dispatch(queue)
+
+    def _dispatch(self, queue):
+        while queue.active < queue.limit and queue.sessions:
+            session_id, waiters = queue.sessions.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                # Session goes to the back of the rotation
+                queue.sessions[session_id] = waiters
+            if waiter.grant():
+                queue.active += 1
+
+    def _remove(self, queue, waiter):
+        waiters = queue.sessions.get(waiter.session_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del queue.sessions[waiter.session_id]
+
+    @staticmethod
+    def _position(queue, waiter):
+        # 1-based position in round-robin grant order
+        sessions = list(queue.sessions.items())
+        for j, (session_id, waiters) in enumerate(sessions):
+            if session_id != waiter.session_id:
+                continue
+            try:
+                i = waiters.index(waiter)
+            except ValueError:
+                return None
+            ahead = sum(min(len(w), i) for _, w in sessions)
+            ahead += sum(1 for _, w in sessions[:j] if len(w) > i)
+            return ahead + 1
+        return None
+
+    @staticmethod
+    def _estimate_wait(queue, position):
+        if position is None or queue.avg_duration is None:
+            return None
+        return math.ceil(position / queue.limit) * queue.avg_duration
+
+
+admission = AdmissionController()
@@ -1,82 +1,50 @@
 import asyncio
 import os
-from pathlib import Path
 import random
+import time
 
 import streamlit as st
 from streamlit_extras.bottom_container import bottom
 
-from utils import run_request, warmup_in_parallel
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from admission import DEFAULT_MAX_STREAMS, admission
+from assets import INTRO_HTML, PAGE_CSS, PROMPT_PRESETS, SPEED_HTML
+from batch import effective_concurrency, new_batch_dir, run_batch
+from utils import build_messages, is_prefix_stable, reasoning_tail, run_request, warmup_in_parallel
 
 MODEL_HOSTNAME = {
     "T-pro 2.0 32B + EAGLE": os.getenv("TPRO_WITH_EAGLE_HOST"),
     "T-pro 2.0 32B": os.getenv("TPRO_HOST"),
     "Qwen3 32B": os.getenv("QWEN_HOST"),
 }
+MODEL_OPTIONS = list(MODEL_HOSTNAME)
 
 
-st.set_page_config(layout="wide")
 
-st.markdown(
-    """
-<style>
-    .st-key-preset_buttons {
-        align-items: center;
-    }
-    .st-key-preset_buttons button {
-        min-height: 1rem;
-    }
-    [data-testid="stBottomBlockContainer"] .stVerticalBlock {
-        gap: 0.5rem;
-    }
-    [data-testid="stHeaderActionElements"] {
-        display: none;
-    }
-    [data-testid="stHeadingWithActionElements"] h1 {
-        font-size: 1.8rem;
-    }
-    [data-testid="stHeadingWithActionElements"] h2 {
-        font-size: 1.4rem;
-    }
-    [data-testid="stHeadingWithActionElements"] h3 {
-        font-size: 1.25rem;
-    }
-    [data-testid="stHeadingWithActionElements"] h4 {
-        font-size: 1.1rem;
-    }
-    [data-testid="stHeadingWithActionElements"] h5 {
-        font-size: 1.05rem;
-    }
-    .stChatInput div {
-        min-height: 100px
-    }
-    .stChatInput div textarea {
-        height: 100%
-    }
-    .stAppToolbar > div > :first-child::after {
-        content: "T-pro 2.0 Interactive Demo";
-        font-weight: 500;
-        margin-left: 20px;
-    }
-    .st-key-right_container .stHorizontalBlock {
-        align-items: center;
-    }
-    .st-key-left_container .stHorizontalBlock {
-        align-items: center;
-    }
+def max_streams_from_env(name):
+    # Unset, empty or invalid values fall back to the default
+    try:
+        return int(os.getenv(name) or DEFAULT_MAX_STREAMS)
+    except ValueError:
+        return DEFAULT_MAX_STREAMS
 
-    [data-testid="stSidebarUserContent"] .stAlert p {
-        font-size: 0.8rem;
-    }
-    [data-testid="stSidebarUserContent"] [data-testid="stAlertContentWarning"] > div {
-        align-items: center;
-        gap: 0.8rem;
-    }
 
-</style>
-""",
-    unsafe_allow_html=True,
-)
+# Maximum in-flight streams per host, shared by all sessions of this process
+MODEL_MAX_STREAMS = {
+    "T-pro 2.0 32B + EAGLE": max_streams_from_env("TPRO_WITH_EAGLE_MAX_STREAMS"),
+    "T-pro 2.0 32B": max_streams_from_env("TPRO_MAX_STREAMS"),
+    "Qwen3 32B": max_streams_from_env("QWEN_MAX_STREAMS"),
+}
+
+for _name, _host in MODEL_HOSTNAME.items():
+    if _host:
+        admission.set_limit(_host, MODEL_MAX_STREAMS[_name])
+
+
+st.set_page_config(layout="wide")
+
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
 if "conversations" not in st.session_state:
     st.session_state.conversations = []
@@ -89,107 +57,125 @@ if "last_state" not in st.session_state:
     }
 if "is_generating" not in st.session_state:
     st.session_state.is_generating = False
+if "last_messages" not in st.session_state:
+    st.session_state.last_messages = {
+        "model1": None,
+        "model2": None,
+    }
+if "batch_results" not in st.session_state:
+    # Only per-prompt summaries are kept here; full outputs go to batch_dir
+    st.session_state.batch_results = []
+    st.session_state.batch_dir = None
+    st.session_state.batch_concurrency = None
+
+
+def current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+
+def cache_summary(cache):
+    if not cache:
+        return ""
+    summary = f"Prefix cache: {cache['hit_ratio']:.0%} of {cache['prompt_tokens']} prompt tokens"
+    if cache["prefill_saved"] is not None:
+        summary += f", ~{cache['prefill_saved']:.2f}s prefill saved"
+    if cache.get("prefix_stable") is False:
+        summary += " (history prefix changed)"
+    return summary
+
+
+def speed_html(token_count, unit, tps, elapsed_time, cache=None):
+    summary = cache_summary(cache)
+    return SPEED_HTML.format(
+        token_count=token_count,
+        unit=unit,
+        tps=tps,
+        elapsed_time=elapsed_time,
+        cache=f"<span>{summary}</span>" if summary else "",
+    )
 
 
 async def run_model_response(container, model_key):
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    for conv in st.session_state.conversations:
-        messages.append({"role": "user", "content": conv["user"]})
-        messages.append({"role": "assistant", "content": conv[model_key]})
-    messages.pop()
+    messages = build_messages(system_prompt, st.session_state.conversations, model_key)
+    previous = st.session_state.last_messages[model_key]
+    prefix_stable = is_prefix_stable(previous, messages) if previous else None
+    st.session_state.last_messages[model_key] = messages
 
     if model_key == "model1":
         base_url = MODEL_HOSTNAME[left_option]
         speed_container = left_speed_container
+        status_container = left_status
         reasoning = left_reasoning
     else:
         base_url = MODEL_HOSTNAME[right_option]
         speed_container = right_speed_container
+        status_container = right_status
         reasoning = right_reasoning
 
+    queued = False
+
+    def on_wait(position, eta):
+        nonlocal queued
+        queued = True
+        wait = f"~{eta:.0f}s" if eta is not None else "estimating..."
+        status_container.info(f"Queued: position {position}, estimated wait {wait}")
+
+    session_id = current_session_id()
+
     with container.chat_message("assistant"):
         expander_container = st.empty()
         placeholder = st.empty()
 
+        thinking_tail = None
         thinking_stopped = False
+        cache = None
+
+        def on_cache(stats):
+            nonlocal cache
+            cache = stats
+            if cache is not None:
+                cache["prefix_stable"] = prefix_stable
+
         async for thinking, answer, token_count, tps, elapsed_time in run_request(
-            base_url, messages, temperature, max_tokens, reasoning
+            base_url, messages, temperature, max_tokens, reasoning, session_id, on_wait, on_cache
         ):
-            speed_container.html(f"""<div style="display: flex; justify-content: space-between; align-items: center;">
-                                 <span>{token_count} symbols</span>
-                                 <span><b>Speed:</b> {tps:.2f} symbols/s</span>
-                                 <span><b>Time:</b> {elapsed_time:.1f}s</span>
-                                 </div>
-                                 """)
+            if queued:
+                queued = False
+                status_container.empty()
+            speed_container.html(speed_html(token_count, "symbols", tps, elapsed_time))
             if not thinking_stopped and thinking:
-                expander_container.expander("Thinking...", expanded=True).markdown(thinking)
+                # Plain-text tail while streaming; markdown is rendered once the thinking phase ends
+                if thinking_tail is None:
+                    thinking_tail = expander_container.expander("Thinking...", expanded=True).empty()
+                thinking_tail.text(reasoning_tail(thinking))
 
             if answer and not thinking_stopped:
                 thinking_stopped = True
                 if thinking:
                     expander_container.expander("Reasoning content", expanded=False).markdown(thinking)
-            placeholder.markdown(answer)
+            if answer:
+                placeholder.markdown(answer)
+
+        if thinking and not thinking_stopped:
+            expander_container.expander("Reasoning content", expanded=False).markdown(thinking)
 
     # Add response to current conversation
     st.session_state.conversations[-1][model_key] = answer
     st.session_state.conversations[-1][f"{model_key}_reasoning"] = thinking
-    st.session_state.last_state[model_key] = (token_count, tps, elapsed_time)
+    st.session_state.conversations[-1][f"{model_key}_cache"] = cache
+    st.session_state.last_state[model_key] = (token_count, tps, elapsed_time, cache)
+    if cache is not None:
+        speed_container.html(speed_html(token_count, "symbols", tps, elapsed_time, cache))
+        print(f"{model_key} turn {len(st.session_state.conversations)}: {cache_summary(cache)}")
 
 
+batch_container = st.empty()
 conversation_container = st.empty()
 
 
 def display_intro_screen():
-    with conversation_container.container(key="intro"):
-        st.markdown("""
-        <div style="text-align: center;">
-            <h1 style="color: #D64E7B; font-size: 3.5rem; font-weight: bold; margin-bottom: 0.5rem; padding: 0">T-pro 2.0 Interactive Demo</h1>
-            <p style="color: #666; font-size: 1.2rem; margin-bottom: 1rem;">A hybrid-reasoning assistant with observable inference optimizations</p>
-            <p style="color: #888; font-size: 1rem; margin-bottom: 3rem;">Compare T-pro 2.0 with EAGLE speculative decoding against baseline models under identical infrastructure</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("<h2 style='text-align: center'>✨ Key Features</h2>", unsafe_allow_html=True)
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown("""
-            <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">🔬</div>
-                <h4>Research & Comparison</h4>
-                <p style="color: #666; font-size: 0.9rem;">Probe reasoning capabilities and compare models side-by-side with explicit reasoning traces.</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown("""
-            <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">⚡</div>
-                <h4>Performance Telemetry</h4>
-                <p style="color: #666; font-size: 0.9rem;">Observe latency, throughput, and streaming speed with token-by-token outputs.</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown("""
-            <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">🎓</div>
-                <h4>Educational Content</h4>
-                <p style="color: #666; font-size: 0.9rem;">Solve olympiad-level problems with step-by-step reasoning for students and educators.</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown("""
-            <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">📚</div>
-                <h4>Curated Benchmarks</h4>
-                <p style="color: #666; font-size: 0.9rem;">Predefined prompts from evaluation suites across Math, Code, QA, and Sciences.</p>
-            </div>
-            """, unsafe_allow_html=True)
+    conversation_container.markdown(INTRO_HTML, unsafe_allow_html=True)
 
 
 def display_conversations():
@@ -205,23 +191,31 @@ def display_conversations():
                     if conv.get("model1_reasoning"):
                         st.expander("Reasoning content", expanded=False).markdown(conv["model1_reasoning"])
                     st.markdown(conv["model1"])
+                    if conv.get("model1_cache"):
+                        st.caption(cache_summary(conv["model1_cache"]))
             with col2:
                 with st.chat_message("assistant"):
                     if conv.get("model2_reasoning"):
                         st.expander("Reasoning content", expanded=False).markdown(conv["model2_reasoning"])
                     st.markdown(conv["model2"])
+                    if conv.get("model2_cache"):
+                        st.caption(cache_summary(conv["model2_cache"]))
     for c, m in ((left_speed_container, "model1"), (right_speed_container, "model2")):
         state = st.session_state.last_state[m]
         if state is None:
             c.empty()
             continue
-        token_count, tps, elapsed_time = state
-        c.html(f"""<div style="display: flex; justify-content: space-between; align-items: center;">
-                    <span>{token_count} tokens</span>
-                    <span><b>Speed:</b> {tps:.2f} symbols/s</span>
-                    <span><b>Time:</b> {elapsed_time:.1f}s</span>
-                    </div>
-                    """)
+        token_count, tps, elapsed_time, cache = state
+        c.html(speed_html(token_count, "tokens", tps, elapsed_time, cache))
+
+
+def display_batch_results():
+    with batch_container.container():
+        st.markdown(
+            f"**Batch results** (concurrency per model: {st.session_state.batch_concurrency}, "
+            f"full outputs in `{st.session_state.batch_dir}`)"
+        )
+        st.dataframe(st.session_state.batch_results, hide_index=True, width="stretch")
 
 
 async def run_both_models(prompt):
@@ -243,6 +237,10 @@ async def run_both_models(prompt):
     )
 
 
+def disable():
+    st.session_state.is_generating = True
+
+
 with st.sidebar:
     st.header("Settings")
     system_prompt = st.text_area("System Prompt", disabled=st.session_state.is_generating)
@@ -257,8 +255,27 @@ with st.sidebar:
     if st.button("Clear Chat", disabled=st.session_state.is_generating, use_container_width=True):
         st.session_state.conversations = []
         st.session_state.last_state = {"model1": None, "model2": None}
+        st.session_state.last_messages = {"model1": None, "model2": None}
+        st.session_state.batch_results = []
         st.rerun()
 
+    with st.expander("Batch run"):
+        batch_prompts = st.selectbox("Prompts", ["All", *PROMPT_PRESETS], disabled=st.session_state.is_generating)
+        # Capped by the per-host stream limit, which is shared with every other session
+        max_concurrency = max(MODEL_MAX_STREAMS.values())
+        batch_concurrency = st.number_input(
+            "Concurrency per model",
+            1,
+            max_concurrency,
+            max_concurrency,
+            1,
+            help="Limited by each model's in-flight stream limit, shared with other users.",
+            disabled=st.session_state.is_generating,
+        )
+        run_batch_clicked = st.button(
+            "Run batch", on_click=disable, disabled=st.session_state.is_generating, use_container_width=True
+        )
+
 # Accept user input
 with bottom():
     col_left_sel, col_right_sel = st.columns(2)
@@ -270,7 +287,7 @@ with bottom():
             with col_model:
                 left_option = st.selectbox(
                     "Left model",
-                    ["T-pro 2.0 32B + EAGLE", "T-pro 2.0 32B", "Qwen3 32B"],
+                    MODEL_OPTIONS,
                     disabled=st.session_state.is_generating or bool(st.session_state.conversations),
                 )
             with col_reasoning:
@@ -285,7 +302,7 @@ with bottom():
             with col_model:
                 right_option = st.selectbox(
                     "Right model",
-                    ["T-pro 2.0 32B + EAGLE", "T-pro 2.0 32B", "Qwen3 32B"],
+                    MODEL_OPTIONS,
                     index=2,
                     disabled=st.session_state.is_generating or bool(st.session_state.conversations),
                 )
@@ -294,10 +311,6 @@ with bottom():
                 right_reasoning = st.checkbox("Reasoning", disabled=st.session_state.is_generating, key="right_reasoning")
 
 
-def disable():
-    st.session_state.is_generating = True
-
-
 if prompt := st.chat_input(disabled=st.session_state.is_generating, on_submit=disable, key="input_preset"):
     models_to_warm = []
     models_to_warm.append(
@@ -319,31 +332,87 @@ if prompt := st.chat_input(disabled=st.session_state.is_generating, on_submit=di
     asyncio.run(run_both_models(prompt))
     st.session_state.is_generating = False
     st.rerun()
-else:
+elif run_batch_clicked:
+    # Same model and reasoning setting on both sides is only run once
+    batch_models = {
+        (left_option, left_reasoning): left_status,
+        (right_option, right_reasoning): right_status,
+    }
+    warm = {option: status for (option, _), status in batch_models.items()}
+    models_to_warm = [
+        {"name": option, "host": MODEL_HOSTNAME[option], "placeholder": status} for option, status in warm.items()
+    ]
     if st.session_state.conversations:
         display_conversations()
     else:
-        display_intro_screen()
+        conversation_container.empty()
+    with st.spinner(
+        "Selected models are hosted on serverless RunPod. Cold starts can take up to ~5 minutes.\nStarting selected models..."
+    ):
+        asyncio.run(warmup_in_parallel(models_to_warm))
+    left_status.empty()
+    right_status.empty()
 
+    categories = PROMPT_PRESETS if batch_prompts == "All" else {batch_prompts: PROMPT_PRESETS[batch_prompts]}
+    jobs = []
+    for category, prompts in categories.items():
+        for i, prompt in enumerate(prompts, 1):
+            for option, reasoning in batch_models:
+                model = f"{option} (reasoning)" if reasoning else option
+                prompt_id = f"{category} #{i}"
+                jobs.append(
+                    {
+                        "prompt_id": prompt_id,
+                        "model": model,
+                        "host": MODEL_HOSTNAME[option],
+                        "reasoning": reasoning,
+                        "messages": build_messages(system_prompt, [{"user": prompt, "batch": ""}], "batch"),
+                        "row": {
+                            "Prompt": prompt_id,
+                            "Model": model,
+                            "Status": "pending",
+                            "Symbols": 0,
+                            "TTFT, s": None,
+                            "Speed, symbols/s": None,
+                            "Time, s": None,
+                        },
+                    }
+                )
+    concurrency = effective_concurrency({job["host"] for job in jobs}, batch_concurrency)
+    st.session_state.batch_concurrency = ", ".join(
+        f"{option} {concurrency[MODEL_HOSTNAME[option]]}" for option in dict.fromkeys(o for o, _ in batch_models)
+    )
+    batch_dir = new_batch_dir()
+    st.session_state.batch_dir = str(batch_dir)
+    st.session_state.batch_results = [job["row"] for job in jobs]
 
+    last_render = {"time": 0.0}
 
-PROMPTS_DIR = Path("prompts")
-prompt_presets: dict[str, list[str]] = {}
+    def on_update():
+        # Redraw the grid at most twice per second regardless of chunk rate
+        now = time.time()
+        if now - last_render["time"] >= 0.5:
+            last_render["time"] = now
+            display_batch_results()
 
-# prompt loading
-for category_dir in PROMPTS_DIR.iterdir():
-    if category_dir.is_dir():
-        prompts = []
-        for prompt_file in category_dir.glob("*.txt"):
-            prompts.append(prompt_file.read_text().strip())
-        if prompts:
-            prompt_presets[category_dir.name] = prompts
+    asyncio.run(
+        run_batch(jobs, temperature, max_tokens, concurrency, batch_dir, on_update, current_session_id())
+    )
+    st.session_state.is_generating = False
+    st.rerun()
+else:
+    if st.session_state.batch_results:
+        display_batch_results()
+    if st.session_state.conversations:
+        display_conversations()
+    elif not st.session_state.batch_results:
+        display_intro_screen()
 
 
 with bottom():
     with st.container(horizontal=True, key="preset_buttons"):
         st.markdown("Preset Prompts:", width="content")
-        for e, v in prompt_presets.items():
+        for e, v in PROMPT_PRESETS.items():
             st.button(
                 e,
                 on_click=lambda p=random.choice(v): st.session_state.update({"input_preset": p}),
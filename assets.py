@@ -0,0 +1,114 @@
+from pathlib import Path
+
+# Static page content, built once per process instead of on every rerun
+
+PAGE_CSS = """<style>
+    .st-key-preset_buttons {
+        align-items: center;
+    }
+    .st-key-preset_buttons button {
+        min-height: 1rem;
+    }
+    [data-testid="stBottomBlockContainer"] .stVerticalBlock {
+        gap: 0.5rem;
+    }
+    [data-testid="stHeaderActionElements"] {
+        display: none;
+    }
+    [data-testid="stHeadingWithActionElements"] h1 {
+        font-size: 1.8rem;
+    }
+    [data-testid="stHeadingWithActionElements"] h2 {
+        font-size: 1.4rem;
+    }
+    [data-testid="stHeadingWithActionElements"] h3 {
+        font-size: 1.25rem;
+    }
+    [data-testid="stHeadingWithActionElements"] h4 {
+        font-size: 1.1rem;
+    }
+    [data-testid="stHeadingWithActionElements"] h5 {
+        font-size: 1.05rem;
+    }
+    .stChatInput div {
+        min-height: 100px
+    }
+    .stChatInput div textarea {
+        height: 100%
+    }
+    .stAppToolbar > div > :first-child::after {
+        content: "T-pro 2.0 Interactive Demo";
+        font-weight: 500;
+        margin-left: 20px;
+    }
+    .st-key-right_container .stHorizontalBlock {
+        align-items: center;
+    }
+    .st-key-left_container .stHorizontalBlock {
+        align-items: center;
+    }
+
+    [data-testid="stSidebarUserContent"] .stAlert p {
+        font-size: 0.8rem;
+    }
+    [data-testid="stSidebarUserContent"] [data-testid="stAlertContentWarning"] > div {
+        align-items: center;
+        gap: 0.8rem;
+    }
+
+</style>
+"""
+
+INTRO_HTML = """
+<div style="text-align: center;">
+    <h1 style="color: #D64E7B; font-size: 3.5rem; font-weight: bold; margin-bottom: 0.5rem; padding: 0">T-pro 2.0 Interactive Demo</h1>
+    <p style="color: #666; font-size: 1.2rem; margin-bottom: 1rem;">A hybrid-reasoning assistant with observable inference optimizations</p>
+    <p style="color: #888; font-size: 1rem; margin-bottom: 3rem;">Compare T-pro 2.0 with EAGLE speculative decoding against baseline models under identical infrastructure</p>
+</div>
+<h2 style="text-align: center">✨ Key Features</h2>
+<div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(220px, 1fr)); gap: 1rem;">
+        <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">🔬</div>
+            <h4>Research & Comparison</h4>
+            <p style="color: #666; font-size: 0.9rem;">Probe reasoning capabilities and compare models side-by-side with explicit reasoning traces.</p>
+        </div>
+        <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">⚡</div>
+            <h4>Performance Telemetry</h4>
+            <p style="color: #666; font-size: 0.9rem;">Observe latency, throughput, and streaming speed with token-by-token outputs.</p>
+        </div>
+        <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">🎓</div>
+            <h4>Educational Content</h4>
+            <p style="color: #666; font-size: 0.9rem;">Solve olympiad-level problems with step-by-step reasoning for students and educators.</p>
+        </div>
+        <div style="text-align: center; padding: 1.5rem; background-color: #f8f9fa; border-radius: 10px; height: 220px; display: flex; flex-direction: column; justify-content: center;">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">📚</div>
+            <h4>Curated Benchmarks</h4>
+            <p style="color: #666; font-size: 0.9rem;">Predefined prompts from evaluation suites across Math, Code, QA, and Sciences.</p>
+        </div>
+</div>
+"""
+
+SPEED_HTML = """<div style="display: flex; justify-content: space-between; align-items: center;">
+    <span>{token_count} {unit}</span>
+    <span><b>Speed:</b> {tps:.2f} symbols/s</span>
+    <span><b>Time:</b> {elapsed_time:.1f}s</span>
+    {cache}
+</div>
+"""
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+
+def load_prompt_presets(prompts_dir=PROMPTS_DIR) -> dict[str, list[str]]:
+    prompt_presets: dict[str, list[str]] = {}
+    for category_dir in sorted(prompts_dir.iterdir()):
+        if category_dir.is_dir():
+            prompts = [prompt_file.read_text().strip() for prompt_file in sorted(category_dir.glob("*.txt"))]
+            if prompts:
+                prompt_presets[category_dir.name] = prompts
+    return prompt_presets
+
+
+PROMPT_PRESETS = load_prompt_presets()
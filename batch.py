@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+from admission import admission
+from utils import run_request
+
+BATCH_OUTPUT_DIR = Path(os.getenv("BATCH_OUTPUT_DIR", "batch_outputs"))
+
+
+def _slug(name):
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")
+
+
+def new_batch_dir():
+    # Several sessions can start a batch in the same second, so make the name unique
+    path = BATCH_OUTPUT_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path.mkdir(parents=True, exist_ok=False)
+    return path
+
+
+def effective_concurrency(hosts, requested):
+    # More streams than the host's admission limit would only wait in its queue
+    return {host: min(requested, admission.stats(host)["limit"]) for host in hosts}
+
+
+def _write_output(output_dir, job, thinking, answer):
+    path = output_dir / _slug(job["model"]) / f"{_slug(job['prompt_id'])}.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    parts = [f"# {job['prompt_id']}\n\n{job['messages'][-1]['content']}\n"]
+    if thinking:
+        parts.append(f"## Reasoning\n\n{thinking.strip()}\n")
+    parts.append(f"## Answer\n\n{answer.strip()}\n")
+    path.write_text("\n".join(parts), encoding="utf-8")
+
+
+async def run_batch(jobs, temperature, max_tokens, concurrency, output_dir, on_update, session_id="default"):
+    """Run all jobs with at most `concurrency[host]` streams in flight per host.
+
+    Each job's `row` is a small summary dict updated in place as the stream
+    progresses; full outputs are written under `output_dir` and not kept in memory.
+    """
+    semaphores = {host: asyncio.Semaphore(n) for host, n in concurrency.items()}
+
+    async def run_job(job):
+        row = job["row"]
+        async with semaphores[job["host"]]:
+
+            def on_wait(position, eta):
+                row["Status"] = f"queued #{position}"
+                on_update()
+
+            row["Status"] = "running"
+            on_update()
+            thinking = answer = ""
+            try:
+                async for thinking, answer, token_count, tps, elapsed_time in run_request(
+                    job["host"], job["messages"], temperature, max_tokens, job["reasoning"], session_id, on_wait
+                ):
+                    if row["TTFT, s"] is None:
+                        row["TTFT, s"] = round(elapsed_time, 2)
+                        row["Status"] = "running"
+                    row["Symbols"] = token_count
+                    row["Speed, symbols/s"] = round(tps, 1)
+                    row["Time, s"] = round(elapsed_time, 1)
+                    on_update()
+                _write_output(output_dir, job, thinking, answer)
+                row["Status"] = "done"
+            except Exception as e:
+                row["Status"] = f"error: {e}"
+        on_update()
+
+    await asyncio.gather(*(run_job(job) for job in jobs))
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary = [job["row"] for job in jobs]
+    (output_dir / "summary.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,185 @@
+"""Replay recorded stream traces through app.py and check rendering budgets.
+
+Record traces from a live session with
+
+    STREAM_TRACE_FILE=traces.jsonl streamlit run app.py
+
+then replay them through run_model_response and the rendering path:
+
+    python benchmarks/bench_replay.py traces.jsonl --speed 1     # original timing
+    python benchmarks/bench_replay.py traces.jsonl --speed 10    # 10x faster
+    python benchmarks/bench_replay.py traces.jsonl --speed 0     # maximum speed
+
+Without a trace file a long synthetic reasoning trace is generated. Exits
+non-zero when a budget is exceeded. The render calls per second budget is
+only checked at original timing (--speed 1); unless given explicitly it is
+derived from the trace's own chunk rate.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+
+DEFAULT_BUDGETS = {
+    "render_calls_per_s": None,  # derived, see RENDER_CALLS_PER_TRACE_CHUNK
+    "render_calls_per_chunk": 4,
+    "render_kb_per_chunk": 2,
+    "cpu_ms_per_chunk": 5,
+    "peak_mb": 64,
+}
+
+# Both columns render every trace chunk; allow a little over two calls per column
+RENDER_CALLS_PER_TRACE_CHUNK = 5
+
+MATH_LINES = [
+    r"Let $f(x) = \sum_{k=1}^{n} \frac{x^k}{k!}$, so $f'(x) = \sum_{k=0}^{n-1} \frac{x^k}{k!}$.",
+    r"By Cauchy-Schwarz, $\left(\sum a_i b_i\right)^2 \le \sum a_i^2 \sum b_i^2$.",
+    r"$$\int_0^1 x^2 \ln x \, dx = -\frac{1}{9}$$",
+    r"Hence $\lim_{n \to \infty} \left(1 + \frac{1}{n}\right)^n = e$ and the bound holds.",
+    "Now check the boundary case separately.",
+]
+
+
+def synthetic_trace(path, chunks, interval, seed=0):
+    rng = random.Random(seed)
+    thinking = ""
+    while len(thinking) < chunks * 4 * 0.9:
+        thinking += rng.choice(MATH_LINES) + "\n\n"
+    answer = "The answer is $-\\frac{1}{9}$."
+    # Think tags arrive as single tokens from the server
+    pieces = ["<think>"]
+    pieces += [thinking[i : i + 4] for i in range(0, len(thinking), 4)]
+    pieces += ["</think>"]
+    pieces += [answer[i : i + 4] for i in range(0, len(answer), 4)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(["h", "synthetic", {"synthetic": True}]) + "\n")
+        for i, piece in enumerate(pieces):
+            f.write(json.dumps(["c", "synthetic", round(i * interval, 4), piece]) + "\n")
+        usage = {"prompt_tokens": 1200, "cached_tokens": 1024}
+        f.write(json.dumps(["c", "synthetic", round(len(pieces) * interval, 4), usage]) + "\n")
+        f.write(json.dumps(["e", "synthetic", round(len(pieces) * interval, 4)]) + "\n")
+
+
+def trace_chunk_rate(traces):
+    chunks = sum(len(trace["chunks"]) for trace in traces)
+    duration = sum(trace["end"] or trace["chunks"][-1][0] for trace in traces)
+    return chunks / duration if duration > 0 else None
+
+
+def replay(trace_file, speed, timeout):
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+    from streamlit.testing.v1 import AppTest
+
+    import tracing
+    import utils
+
+    traces = tracing.load_traces(trace_file)
+
+    counters = {"chunks": 0, "messages": 0, "bytes": 0}
+
+    enqueue = ScriptRunner._enqueue_forward_msg
+
+    def counting_enqueue(self, msg):
+        counters["messages"] += 1
+        counters["bytes"] += msg.ByteSize()
+        enqueue(self, msg)
+
+    run_request = utils.run_request
+
+    async def counting_run_request(*args, **kwargs):
+        async for item in run_request(*args, **kwargs):
+            counters["chunks"] += 1
+            yield item
+
+    replayer = tracing.replayer
+    ScriptRunner._enqueue_forward_msg = counting_enqueue
+    utils.run_request = counting_run_request
+    tracing.replayer = tracing.TraceReplayer(traces, speed)
+    try:
+        at = AppTest.from_file(str(APP), default_timeout=timeout)
+        at.run()
+        counters.update(chunks=0, messages=0, bytes=0)
+
+        tracemalloc.start()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        at.chat_input[0].set_value("Replay").run()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        ScriptRunner._enqueue_forward_msg = enqueue
+        utils.run_request = run_request
+        tracing.replayer = replayer
+
+    if at.exception:
+        raise RuntimeError(at.exception)
+    chunks = max(counters["chunks"], 1)
+    rate = trace_chunk_rate(traces)
+    return {
+        "chunks": counters["chunks"],
+        "trace_chunks_per_s": rate * speed if rate and speed > 0 else 0.0,
+        "wall_s": wall,
+        "render_calls_per_s": counters["messages"] / wall,
+        "render_calls_per_chunk": counters["messages"] / chunks,
+        "render_kb_per_chunk": counters["bytes"] / chunks / 1024,
+        "cpu_ms_per_chunk": cpu * 1000 / chunks,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def effective_budgets(result, budgets, speed):
+    budgets = dict(budgets)
+    if speed != 1:
+        # Calls per second only mean something at the original chunk timing
+        budgets.pop("render_calls_per_s", None)
+    elif budgets.get("render_calls_per_s") is None:
+        budgets["render_calls_per_s"] = RENDER_CALLS_PER_TRACE_CHUNK * result["trace_chunks_per_s"]
+    return {name: budget for name, budget in budgets.items() if budget is not None}
+
+
+def over_budget(result, budgets, speed):
+    budgets = effective_budgets(result, budgets, speed)
+    return {name: value for name, value in result.items() if name in budgets and value > budgets[name]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace_file", nargs="?", help="trace recorded with STREAM_TRACE_FILE")
+    parser.add_argument("--speed", type=float, default=1, help="timing multiplier, 0 for maximum speed")
+    parser.add_argument("--chunks", type=int, default=3000, help="length of the synthetic trace")
+    parser.add_argument("--interval", type=float, default=0.005, help="chunk interval of the synthetic trace")
+    parser.add_argument("--timeout", type=float, default=600)
+    for name, budget in DEFAULT_BUDGETS.items():
+        parser.add_argument(f"--max-{name.replace('_', '-')}", type=float, default=budget)
+    args = parser.parse_args()
+
+    trace_file = args.trace_file
+    if trace_file is None:
+        trace_file = Path(tempfile.mkdtemp()) / "synthetic.jsonl"
+        synthetic_trace(trace_file, args.chunks, args.interval)
+
+    result = replay(trace_file, args.speed, args.timeout)
+
+    budgets = effective_budgets(result, {name: getattr(args, f"max_{name}") for name in DEFAULT_BUDGETS}, args.speed)
+    over = over_budget(result, budgets, args.speed)
+    for name, value in result.items():
+        limit = f"(budget {budgets[name]:g})" if name in budgets else ""
+        print(f"{name:<24} {value:10.2f} {limit} {'OVER BUDGET' if name in over else ''}".rstrip())
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
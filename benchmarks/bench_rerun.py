@@ -0,0 +1,68 @@
+"""Measure process cold start and steady-state rerun time of app.py.
+
+    python benchmarks/bench_rerun.py --reruns 50
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+
+COLD_START = f"""
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({str(APP)!r}, default_timeout=60)
+at.run()
+assert not at.exception, at.exception
+"""
+
+
+def cold_start(runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", COLD_START], cwd=ROOT, check=True, capture_output=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def reruns(runs):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    at.run()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    assert not at.exception, at.exception
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"{name:<12} n={len(timings):<4} median={statistics.median(timings) * 1000:8.1f}ms "
+        f"p95={p95 * 1000:8.1f}ms max={timings[-1] * 1000:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cold-starts", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    report("cold start", cold_start(args.cold_starts))
+    report("rerun", reruns(args.reruns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from bench_replay import DEFAULT_BUDGETS, over_budget, replay, synthetic_trace
+
+
+def test_long_reasoning_trace_within_budgets(tmp_path):
+    trace_file = tmp_path / "synthetic.jsonl"
+    synthetic_trace(trace_file, chunks=1000, interval=0.005)
+
+    result = replay(trace_file, speed=1, timeout=600)
+
+    assert result["chunks"] > 0
+    assert over_budget(result, DEFAULT_BUDGETS, speed=1) == {}
+
+
+def test_replays_use_their_own_trace_and_speed(tmp_path):
+    short, long = tmp_path / "short.jsonl", tmp_path / "long.jsonl"
+    synthetic_trace(short, chunks=100, interval=0.005)
+    synthetic_trace(long, chunks=300, interval=0.005)
+
+    fast = replay(short, speed=0, timeout=600)
+    timed = replay(long, speed=1, timeout=600)
+
+    assert timed["chunks"] > fast["chunks"]
+    assert timed["wall_s"] >= 300 * 0.005
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks = []  # (offset, delta) relative to upstream start
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.listeners = set()  # (loop, event) of subscribers waiting for chunks
+        self.task = None
+        self.cancelled = False
+
+
+class StreamCoalescer:
+    """Single-flight layer: identical in-flight streams share one upstream generation.
+
+    Upstream generators run on a background event loop, so a stream survives
+    the session that started it as long as anyone is still subscribed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[object, _Flight] = {}
+        self._loop = None
+
+    def join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                return None
+            flight.subscribers += 1
+        return self._follow(key, flight)
+
+    def start(self, key, factory, on_done=None):
+        """Start `factory()` upstream unless `key` is already in flight.
+
+        Returns the subscription and whether a new upstream was started.
+        `on_done(duration)` is called on the background loop once the upstream
+        has stopped, including when it is cancelled before it starts running.
+        """
+        loop = self._background_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            started = flight is None
+            if started:
+                flight = self._flights[key] = _Flight()
+                asyncio.run_coroutine_threadsafe(self._run(key, flight, factory, on_done), loop)
+            flight.subscribers += 1
+        return self._follow(key, flight), started
+
+    def _background_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="stream-coalescer", daemon=True).start()
+            return self._loop
+
+    async def _run(self, key, flight, factory, on_done):
+        start = time.time()
+        flight.task = asyncio.current_task()
+        try:
+            if not flight.cancelled:
+                await self._pump(key, flight, factory)
+        finally:
+            # Only now is the upstream stream closed, so its slot can be reused
+            if on_done is not None:
+                on_done(time.time() - start)
+
+    def _cancel(self, flight):
+        # Runs on the background loop; a task that has not started yet sees the flag
+        flight.cancelled = True
+        if flight.task is not None:
+            flight.task.cancel()
+
+    async def _pump(self, key, flight, factory):
+        start = time.time()
+        try:
+            async for delta in factory():
+                with self._lock:
+                    flight.chunks.append((time.time() - start, delta))
+                    listeners = self._take_listeners(flight)
+                self._notify(listeners)
+        except BaseException as e:
+            flight.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            with self._lock:
+                flight.done = True
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                listeners = self._take_listeners(flight)
+            self._notify(listeners)
+
+    async def _follow(self, key, flight):
+        event = asyncio.Event()
+        listener = (asyncio.get_running_loop(), event)
+        index = 0
+        try:
+            while True:
+                with self._lock:
+                    chunks = flight.chunks[index:]
+                    index += len(chunks)
+                    done = flight.done
+                    if not chunks and not done:
+                        event.clear()
+                        flight.listeners.add(listener)
+                # Late subscribers get everything produced so far, then the live tail
+                for chunk in chunks:
+                    yield chunk
+                if chunks:
+                    continue
+                if done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await event.wait()
+        finally:
+            with self._lock:
+                flight.listeners.discard(listener)
+                flight.subscribers -= 1
+                cancel = flight.subscribers == 0 and not flight.done
+                if cancel and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if cancel:
+                self._loop.call_soon_threadsafe(self._cancel, flight)
+
+    @staticmethod
+    def _take_listeners(flight):
+        listeners = list(flight.listeners)
+        flight.listeners.clear()
+        return listeners
+
+    @staticmethod
+    def _notify(listeners):
+        for loop, event in listeners:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Subscriber's loop is already closed
+                pass
+
+
+coalescer = StreamCoalescer()
@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+# Trace files are append-only JSON lines, one event per line, so concurrent
+# streams interleave safely and a crash only loses the unflushed tail:
+#   ["h", trace_id, meta]          stream header
+#   ["c", trace_id, offset, delta] chunk, offset in seconds from stream start;
+#                                  delta is text or the final usage object
+#   ["e", trace_id, offset]        stream end
+
+
+class TraceRecorder:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    async def record(self, stream, meta):
+        trace_id = uuid.uuid4().hex[:12]
+        self._write(["h", trace_id, meta])
+        start = time.time()
+        try:
+            async for delta in stream:
+                self._write(["c", trace_id, round(time.time() - start, 4), delta])
+                yield delta
+        finally:
+            self._write(["e", trace_id, round(time.time() - start, 4)], flush=True)
+
+    def _write(self, event, flush=False):
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            if flush:
+                self._file.flush()
+
+
+def load_traces(path):
+    traces = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            kind, trace_id = event[0], event[1]
+            if kind == "h":
+                traces[trace_id] = {"id": trace_id, "meta": event[2], "chunks": [], "end": None}
+            elif kind == "c" and trace_id in traces:
+                traces[trace_id]["chunks"].append((event[2], event[3]))
+            elif kind == "e" and trace_id in traces:
+                traces[trace_id]["end"] = event[2]
+    return [t for t in traces.values() if t["chunks"]]
+
+
+class TraceReplayer:
+    """Serves recorded traces in place of the model, cycling through them per request.
+
+    `speed` scales the original chunk timing; 0 replays at maximum speed.
+    """
+
+    def __init__(self, traces, speed=1.0):
+        if not traces:
+            raise ValueError("no traces to replay")
+        self.traces = traces
+        self.speed = speed
+        self._counter = itertools.count()
+
+    async def stream(self):
+        trace = self.traces[next(self._counter) % len(self.traces)]
+        start = time.time()
+        for offset, delta in trace["chunks"]:
+            delay = offset / self.speed - (time.time() - start) if self.speed > 0 else 0
+            # Always yield to the loop, even at maximum speed
+            await asyncio.sleep(max(delay, 0))
+            yield delta
+
+
+recorder = TraceRecorder(os.environ["STREAM_TRACE_FILE"]) if os.getenv("STREAM_TRACE_FILE") else None
+replayer = (
+    TraceReplayer(load_traces(os.environ["STREAM_REPLAY_FILE"]), float(os.getenv("STREAM_REPLAY_SPEED", "1")))
+    if os.getenv("STREAM_REPLAY_FILE")
+    else None
+)
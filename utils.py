@@ -1,9 +1,11 @@
 import asyncio
+import json
 import os
 import time
 
-import requests
-from openai import AsyncOpenAI
+from admission import admission
+from coalescing import coalescer
+import tracing
 
 API_KEY = os.getenv("API_KEY")
 
@@ -23,6 +25,9 @@ def health_check_with_retry(base_url, api_key, max_wait_seconds=600, delay=5):
     ping_base = clean_ping_base(base_url)
     if not ping_base:
         return False
+    # Imported on first use so reruns that never warm up a model don't pay for it
+    import requests
+
     headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
     start = time.time()
     while time.time() - start < max_wait_seconds:
@@ -37,6 +42,9 @@ def health_check_with_retry(base_url, api_key, max_wait_seconds=600, delay=5):
     return False
 
 async def warmup_single(name, host, status_placeholder):
+    if tracing.replayer is not None:
+        # Replaying recorded traces, there is no model to start
+        return True
     if not host:
         status_placeholder.error(f"{name}: missing host URL.")
         return False
@@ -57,13 +65,8 @@ async def warmup_in_parallel(models):
     return all(results)
 
 
-async def run_request(base_url, messages, temperature, max_tokens, use_reasoning):
-    thinking = ""
-    answer = ""
-    token_count = 0
-    in_think = False
-    buffer = ""
-    start = time.time()
+async def _stream_deltas(base_url, messages, temperature, max_tokens, use_reasoning):
+    from openai import AsyncOpenAI
 
     async with AsyncOpenAI(base_url=base_url, api_key=API_KEY) as client:
         async for chunk in await client.chat.completions.create(
@@ -72,31 +75,137 @@ async def run_request(base_url, messages, temperature, max_tokens, use_reasoning
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
+            stream_options={"include_usage": True},
             extra_body={"chat_template_kwargs": {"enable_thinking": use_reasoning}},
         ):
+            if chunk.usage is not None:
+                # Final chunk; cached_tokens is only reported when the server exposes prompt token details
+                details = chunk.usage.prompt_tokens_details
+                yield {
+                    "prompt_tokens": chunk.usage.prompt_tokens,
+                    "cached_tokens": details.cached_tokens if details else None,
+                }
             delta = chunk.choices[0].delta.content if chunk.choices else None
-            if not delta:
-                continue
-            token_count += len(delta)
-            buffer += delta
-
-            if "<think>" in buffer:
-                in_think = True
-                buffer = buffer.replace("<think>", "")
-            if "</think>" in buffer:
-                in_think = False
-                before, after = buffer.split("</think>", 1)
-                thinking += before
-                buffer = after
-
-            if in_think:
-                thinking += buffer
-                buffer = ""
-            else:
-                answer += buffer
-                buffer = ""
-
-            tps = token_count / (time.time() - start + 1e-5)
-            elapsed_time = time.time() - start
-
-            yield thinking, answer, token_count, tps, elapsed_time
+            if delta:
+                yield delta
+
+
+def _upstream(base_url, messages, temperature, max_tokens, use_reasoning):
+    if tracing.replayer is not None:
+        return tracing.replayer.stream()
+    stream = _stream_deltas(base_url, messages, temperature, max_tokens, use_reasoning)
+    if tracing.recorder is not None:
+        meta = {
+            "base_url": base_url,
+            "messages": len(messages),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "use_reasoning": use_reasoning,
+        }
+        stream = tracing.recorder.record(stream, meta)
+    return stream
+
+
+async def _subscribe(base_url, messages, temperature, max_tokens, use_reasoning, session_id, on_wait):
+    # Identical requests that are already streaming are joined instead of re-generated;
+    # only the session that starts the upstream stream goes through admission.
+    key = (base_url, json.dumps(messages, sort_keys=True), temperature, max_tokens, use_reasoning)
+    stream = coalescer.join(key)
+    if stream is not None:
+        return stream
+
+    await admission.acquire(base_url, session_id, on_wait)
+    stream, started = coalescer.start(
+        key,
+        lambda: _upstream(base_url, messages, temperature, max_tokens, use_reasoning),
+        on_done=lambda duration: admission.release(base_url, duration),
+    )
+    if not started:
+        admission.release(base_url)
+    return stream
+
+
+def build_messages(system_prompt, conversations, model_key):
+    # Prior turns are normalized the way the chat template renders them (trimmed answer,
+    # no reasoning), so every turn resends a byte-identical prefix for the prefix cache.
+    messages = []
+    if system_prompt and system_prompt.strip():
+        messages.append({"role": "system", "content": system_prompt.strip()})
+    for conv in conversations:
+        messages.append({"role": "user", "content": conv["user"]})
+        messages.append({"role": "assistant", "content": conv[model_key].strip()})
+    messages.pop()
+    return messages
+
+
+def is_prefix_stable(previous, messages):
+    return messages[: len(previous)] == previous
+
+
+def prefix_cache_stats(usage, ttft):
+    prompt_tokens = usage.get("prompt_tokens")
+    cached_tokens = usage.get("cached_tokens")
+    if not prompt_tokens or cached_tokens is None:
+        return None
+    uncached_tokens = prompt_tokens - cached_tokens
+    # TTFT is mostly prefill of the uncached tokens; extrapolate to the cached ones
+    prefill_saved = ttft * cached_tokens / uncached_tokens if ttft and uncached_tokens > 0 else None
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "hit_ratio": cached_tokens / prompt_tokens,
+        "ttft": ttft,
+        "prefill_saved": prefill_saved,
+    }
+
+
+async def run_request(
+    base_url, messages, temperature, max_tokens, use_reasoning, session_id="default", on_wait=None, on_cache=None
+):
+    thinking = ""
+    answer = ""
+    token_count = 0
+    in_think = False
+    buffer = ""
+    tps = 0.0
+    elapsed_time = 0.0
+    ttft = None
+
+    stream = await _subscribe(base_url, messages, temperature, max_tokens, use_reasoning, session_id, on_wait)
+    async for offset, delta in stream:
+        if isinstance(delta, dict):
+            # Final usage chunk; prefix-cache stats go to the callback, not the yielded tuple
+            if on_cache is not None:
+                on_cache(prefix_cache_stats(delta, ttft))
+            continue
+        if ttft is None:
+            ttft = offset
+        token_count += len(delta)
+        buffer += delta
+
+        if "<think>" in buffer:
+            in_think = True
+            buffer = buffer.replace("<think>", "")
+        if "</think>" in buffer:
+            in_think = False
+            before, after = buffer.split("</think>", 1)
+            thinking += before
+            buffer = after
+
+        if in_think:
+            thinking += buffer
+            buffer = ""
+        else:
+            answer += buffer
+            buffer = ""
+
+        tps = token_count / (offset + 1e-5)
+        elapsed_time = offset
+
+        yield thinking, answer, token_count, tps, elapsed_time
+
+
+def reasoning_tail(thinking, max_lines=12, max_chars=2400):
+    # Only look at the end of the trace so the cost does not grow with its length
+    lines = thinking[-max_chars:].splitlines()[-max_lines:]
+    return "\n".join(lines)